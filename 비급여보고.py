@@ -2,11 +2,26 @@
 from __future__ import annotations
 
 import io
+import math
+import os
 import re
-from typing import Dict, List, Tuple
-
+import tempfile
+import xml.etree.ElementTree as ET
+import zipfile
+from datetime import date, time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import openpyxl
 import pandas as pd
 import streamlit as st
+import xlsxwriter
+
+try:
+    import python_calamine
+    READ_ENGINE = "calamine"
+except ImportError:
+    READ_ENGINE = "openpyxl"
 
 APP_VERSION = "비급여보고통계 남양주백병원 / vCalcSubtotalOnly"
 
@@ -21,49 +36,194 @@ ALIASES: Dict[str, List[str]] = {
     "오더명칭": ["오더명칭", "오더 명칭", "처방명", "처방명칭", "명칭", "항목명", "ordername", "order_name"],
 }
 
+_WS_RE = re.compile(r"\s+")
+_SHEET_BAD_RE = re.compile(r"[\\/*?:\[\]]")
+_XLSX_EXT_RE = re.compile(r"\.xlsx$", re.IGNORECASE)
+_NUM_RE = re.compile(r"[^0-9.\-]")
+
+# xlsx 내부 XML 네임스페이스
+_XL_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+_REL_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+_PKG_REL_NS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+
 REQUIRED_COLS = ["차트번호", "오더코드", "청구코드", "오더금액", "단가", "일수", "오더명칭"]
 DISPLAY_COLS = ["오더코드", "청구코드", "오더금액", "단가", "계산", "일수", "오더명칭"]
+SUMMARY_COLS = ["시트(파일명)", "원본시트", "소계 행수", "오더금액 합계", "계산 합계"]
+DEBUG_COLS = ["파일", "원본시트", *[f"{c}(매핑)" for c in ALIASES], "소계표 계산 상위5", "소계표 계산 dtype"]
 
 
 def _norm(s: str) -> str:
-    s = str(s).replace("\n", "").replace("\r", "")
-    s = re.sub(r"\s+", "", s)
-    return s.lower()
+    # \s 에 \n, \r 포함 → 공백 제거 정규식 한 번으로 충분
+    return _WS_RE.sub("", str(s)).lower()
+
+
+# 정규화된 별칭 → (표준컬럼, 별칭 우선순위) : import 시 한 번만 계산
+ALIAS_INDEX: Dict[str, Tuple[str, int]] = {}
+for _std, _cands in ALIASES.items():
+    for _rank, _cand in enumerate(_cands):
+        ALIAS_INDEX.setdefault(_norm(_cand), (_std, _rank))
+
+
+def _parse_nums(arr: np.ndarray) -> np.ndarray:
+    # object 배열을 한 번만 훑으며 셀마다 바로 float 변환 (중간 Series 없음)
+    #    숫자 셀은 그대로, 문자 셀은 콤마만 빼고 바로 변환 → 실패("1,200원" 등) 시에만 정규식 정리, 실패·결측은 0
+    out = np.zeros(len(arr), dtype=np.float64)
+    for i, v in enumerate(arr):
+        if v is None or isinstance(v, bool):
+            continue
+        if isinstance(v, (int, float, np.number)):
+            if v == v:
+                out[i] = v
+            continue
+        t = str(v).replace(",", "")
+        try:
+            x = float(t)
+        except ValueError:
+            x = math.nan
+        if not math.isfinite(x):
+            try:
+                x = float(_NUM_RE.sub("", t))
+            except ValueError:
+                continue
+        out[i] = x
+    return out
 
 
 def _to_num(s: pd.Series) -> pd.Series:
-    s = s.astype(str).str.strip()
-    s = s.replace({"nan": "", "None": ""})
-    s = s.str.replace(",", "", regex=False)
-    s = s.str.replace(r"[^0-9\.\-]", "", regex=True)
-    return pd.to_numeric(s, errors="coerce").fillna(0)
+    # 엑셀에서 이미 숫자 dtype으로 읽힌 컬럼은 문자 정리 불필요
+    if pd.api.types.is_numeric_dtype(s) and not pd.api.types.is_bool_dtype(s):
+        return s.fillna(0)
+
+    return pd.Series(_parse_nums(s.to_numpy(dtype=object)), index=s.index, name=s.name)
 
 
-def _clean_sheet_name(name: str, used: set[str]) -> str:
+def _clean_sheet_name(name: str, used: Dict[str, int]) -> str:
+    # used: 사용한 시트명(casefold) → 그 이름이 또 나오면 붙일 다음 번호 (충돌마다 _2부터 다시 세지 않음)
+    #    엑셀 시트명은 대소문자를 구분하지 않음("Data"/"data" 충돌), 앞뒤 작은따옴표(')도 불가
     name = (name or "").strip()
-    name = re.sub(r"[\\/*?:\[\]]", "_", name)
-    if not name:
-        name = "Sheet"
-    base = name[:31]
-    if base not in used:
-        used.add(base)
+    name = _SHEET_BAD_RE.sub("_", name)
+    base = name[:31].strip("'") or "Sheet"
+    key = base.casefold()
+    if key not in used:
+        used[key] = 2
         return base
-    i = 2
+    i = used[key]
     while True:
         suf = f"_{i}"
         cand = f"{base[:31-len(suf)]}{suf}"
-        if cand not in used:
-            used.add(cand)
-            return cand
         i += 1
+        if cand.casefold() not in used:
+            used[key] = i
+            used[cand.casefold()] = 2
+            return cand
+
+
+def _col_index(ref: str) -> int:
+    # "C1" → 2
+    n = 0
+    for ch in ref:
+        if not ch.isalpha():
+            break
+        n = n * 26 + (ord(ch.upper()) - 64)
+    return n - 1
+
+
+def _xml_text(el) -> str:
+    # <si>/<is> 의 <t>, <r><t> 만 이어붙임 (<rPh> 발음표기 제외)
+    parts = []
+    for child in el:
+        if child.tag == _XL_NS + "t":
+            parts.append(child.text or "")
+        elif child.tag == _XL_NS + "r":
+            t = child.find(_XL_NS + "t")
+            parts.append((t.text or "") if t is not None else "")
+    return "".join(parts)
+
+
+def _iter_shared_strings(zf: zipfile.ZipFile) -> Iterator[str]:
+    with zf.open("xl/sharedStrings.xml") as fp:
+        for _, el in ET.iterparse(fp):
+            if el.tag == _XL_NS + "si":
+                yield _xml_text(el)
+                el.clear()
+
+
+def _iter_xlsx_headers(data: bytes) -> Iterator[Tuple[str, list]]:
+    # xlsx = ZIP + XML : 시트 XML을 앞에서부터 읽다가 첫 <row>에서 멈춤 (pandas/openpyxl 미사용)
+    #    공유문자열(sharedStrings.xml)은 헤더가 참조하는 번호까지만 읽음
+    with zipfile.ZipFile(io.BytesIO(data)) as zf:
+        wb = ET.fromstring(zf.read("xl/workbook.xml"))
+        rels = ET.fromstring(zf.read("xl/_rels/workbook.xml.rels"))
+        targets = {r.get("Id"): r.get("Target", "") for r in rels.iter(_PKG_REL_NS + "Relationship")}
+
+        sst: List[str] = []
+        sst_iter: Optional[Iterator[str]] = None
+        try:
+            for sheet in wb.iter(_XL_NS + "sheet"):
+                target = targets.get(sheet.get(_REL_NS + "id"), "")
+                path = target.lstrip("/") if target.startswith("/") else "xl/" + target
+
+                header: list = []
+                with zf.open(path) as fp:
+                    for _, el in ET.iterparse(fp):
+                        if el.tag != _XL_NS + "row":
+                            continue
+                        if el.get("r", "1") == "1":
+                            for c in el.iter(_XL_NS + "c"):
+                                t = c.get("t")
+                                if t == "inlineStr":
+                                    node = c.find(_XL_NS + "is")
+                                    val = _xml_text(node) if node is not None else ""
+                                else:
+                                    node = c.find(_XL_NS + "v")
+                                    val = node.text if node is not None else None
+                                    if t == "s" and val is not None:
+                                        if sst_iter is None:
+                                            sst_iter = _iter_shared_strings(zf)
+                                        idx = int(val)
+                                        while len(sst) <= idx:
+                                            sst.append(next(sst_iter, ""))
+                                        val = sst[idx]
+                                col = _col_index(c.get("r")) if c.get("r") else len(header)
+                                header.extend([None] * (col + 1 - len(header)))
+                                header[col] = val
+                        break
+
+                yield sheet.get("name"), header
+        finally:
+            if sst_iter is not None:
+                sst_iter.close()
+
+
+def _probe_target_sheet(data: bytes) -> Optional[Tuple[str, list]]:
+    # (시트명, 헤더) 반환. 실패(비표준 xlsx 등) 시 None → ExcelFile 기반 _find_target_sheet로 대체
+    candidates_norm = {_norm(x) for x in ALIASES.get("차트번호", ["차트번호"])}
+    first = None
+    try:
+        for sh, header in _iter_xlsx_headers(data):
+            if first is None:
+                first = (sh, header)
+            if any(_norm(c) in candidates_norm for c in header if c is not None):
+                return sh, header
+    except Exception:
+        return None
+    return first
+
+
+def _sheet_header(xls: pd.ExcelFile, sh: str) -> list:
+    # DataFrame을 만들지 않고 엔진의 워크북에서 1행(헤더)만 읽음
+    if xls.engine == "calamine":
+        rows = xls.book.get_sheet_by_name(sh).to_python(skip_empty_area=False, nrows=1)
+    else:
+        rows = xls.book[sh].iter_rows(max_row=1, values_only=True)
+    return list(next(iter(rows), ()))
 
 
 def _find_target_sheet(xls: pd.ExcelFile) -> str:
     candidates_norm = [_norm(x) for x in ALIASES.get("차트번호", ["차트번호"])]
     for sh in xls.sheet_names:
         try:
-            head = pd.read_excel(xls, sheet_name=sh, nrows=5)
-            cols_norm = [_norm(c) for c in head.columns]
+            cols_norm = [_norm(c) for c in _sheet_header(xls, sh) if c is not None]
             if any(cn in cols_norm for cn in candidates_norm):
                 return sh
         except Exception:
@@ -71,33 +231,55 @@ def _find_target_sheet(xls: pd.ExcelFile) -> str:
     return xls.sheet_names[0]
 
 
-def _load_original(uploaded) -> Tuple[pd.DataFrame, str]:
-    data = uploaded.getvalue()
-    xls = pd.ExcelFile(io.BytesIO(data), engine="openpyxl")
-    sh = _find_target_sheet(xls)
-    df = pd.read_excel(xls, sheet_name=sh, engine="openpyxl")
+def _pick_aliases(names: list) -> Dict[str, int]:
+    # 표준컬럼 → 선택된 원본 컬럼 위치
+    # 같은 표준컬럼에 여러 원본 컬럼이 걸리면 ALIASES 앞쪽 별칭이 우선 (같은 별칭이면 뒤쪽 컬럼)
+    # 완전히 같은 헤더가 반복되면 첫 번째만 후보 → pandas가 뒤의 것을 "금액.1"로 바꾸므로
+    #    원본 XML 헤더에서 고른 위치와 파싱된 DataFrame 컬럼명이 항상 일치
+    best: Dict[str, Tuple[int, int]] = {}
+    seen = set()
+    for j, name in enumerate(names):
+        if name is None or name in seen:
+            continue
+        seen.add(name)
+        hit = ALIAS_INDEX.get(_norm(name))
+        if hit is None:
+            continue
+        std, rank = hit
+        if std not in best or rank <= best[std][0]:
+            best[std] = (rank, j)
+    return {std: best[std][1] for std in ALIASES if std in best}
+
+
+def _load_original(data: bytes) -> Tuple[pd.DataFrame, str]:
+    probed = _probe_target_sheet(data)
+    xls = pd.ExcelFile(io.BytesIO(data), engine=READ_ENGINE)
+    if probed is None or probed[0] not in xls.sheet_names:
+        sh = _find_target_sheet(xls)
+        header = _sheet_header(xls, sh)
+    else:
+        sh, header = probed
+
+    # ✅ 필터/합계에 쓰는 표준 컬럼만 파싱 (원본 시트 전체는 _write_file_sheet가 바이트에서 직접 복사)
+    # 필수 컬럼이 헤더에서 다 안 잡히면 전체를 읽어 누락 오류에 실제 컬럼 목록이 나오게 함
+    picked = _pick_aliases(header)
+    usecols = sorted(picked.values()) if all(c in picked for c in REQUIRED_COLS) else None
+    df = xls.parse(sh, usecols=usecols)
     return df, sh
 
 
 def _canonical_view(df: pd.DataFrame) -> Tuple[pd.DataFrame, Dict[str, str]]:
-    norm_to_raw = {_norm(c): c for c in df.columns}
-    rename_map_raw_to_std: Dict[str, str] = {}
-    picked_std_to_raw: Dict[str, str] = {}
-
-    for std, cand_list in ALIASES.items():
-        for cand in cand_list:
-            k = _norm(cand)
-            if k in norm_to_raw:
-                raw_col = norm_to_raw[k]
-                rename_map_raw_to_std[raw_col] = std
-                picked_std_to_raw[std] = raw_col
-                break
-
-    dfw = df.rename(columns=rename_map_raw_to_std).copy()
+    raw_cols = list(df.columns)
+    picked_std_to_raw = {std: raw_cols[j] for std, j in _pick_aliases(raw_cols).items()}
+    rename_map_raw_to_std = {raw_col: std for std, raw_col in picked_std_to_raw.items()}
+
+    # 얕은 복사 후 컬럼명만 교체 → 원본 데이터 블록은 공유 (rename은 pandas 2.x에서 전체를 깊은 복사)
+    dfw = df.copy(deep=False)
+    dfw.columns = [rename_map_raw_to_std.get(c, c) for c in raw_cols]
     return dfw, picked_std_to_raw
 
 
-def _make_filtered(df_original: pd.DataFrame) -> Tuple[pd.DataFrame, Dict[str, str]]:
+def _make_filtered(df_original: pd.DataFrame) -> Tuple[pd.DataFrame, Dict[str, str], float, float]:
     dfw, picked = _canonical_view(df_original)
 
     safe_required = [c for c in REQUIRED_COLS if c != "계산"]
@@ -113,9 +295,11 @@ def _make_filtered(df_original: pd.DataFrame) -> Tuple[pd.DataFrame, Dict[str, s
         picked["계산"] = "(없음→빈칸생성)"
 
     # ✅ 소계 판정 강화 ("소 계"도 소계로)
-    chart_raw = dfw["차트번호"].astype(str).fillna("").str.strip()
-    chart_key = chart_raw.str.replace(r"\s+", "", regex=True)
-    is_subtotal = chart_key.eq("소계")
+    #    factorize로 고유값만 뽑아 판정 → 행별로는 정수 코드 인덱싱만 (결측 코드 -1은 끝의 False로)
+    codes, uniques = pd.factorize(dfw["차트번호"])
+    hit = np.zeros(len(uniques) + 1, dtype=bool)
+    hit[:-1] = [isinstance(v, str) and "".join(v.split()) == "소계" for v in uniques]
+    is_subtotal = hit[codes]
 
     sub = dfw.loc[is_subtotal, DISPLAY_COLS].copy()
 
@@ -124,32 +308,101 @@ def _make_filtered(df_original: pd.DataFrame) -> Tuple[pd.DataFrame, Dict[str, s
     sub["단가"] = _to_num(sub["단가"])
     sub["계산"] = _to_num(sub["계산"])   # ✅ 핵심
 
-    return sub, picked
-
-
-def _build_excel(
-    per_orig: Dict[str, pd.DataFrame],
-    per_sub: Dict[str, pd.DataFrame],
-    summary_df: pd.DataFrame
-) -> bytes:
-    out = io.BytesIO()
-    used: set[str] = set()
-
-    with pd.ExcelWriter(out, engine="openpyxl") as writer:
-        sum_name = _clean_sheet_name("요약", used)
-        summary_df.to_excel(writer, sheet_name=sum_name, index=False)
-
-        for label in per_orig.keys():
-            sh = _clean_sheet_name(label, used)
-            df_f = per_sub[label]
-            df_o = per_orig[label]
-
-            df_f.to_excel(writer, sheet_name=sh, index=False, startrow=0)
-            startrow = (1 + len(df_f)) + 2
-            df_o.to_excel(writer, sheet_name=sh, index=False, startrow=startrow)
-
-    out.seek(0)
-    return out.getvalue()
+    # ✅ 요약용 합계도 숫자화 직후 여기서 한 번만 계산 (오더금액/계산 모두 소계표 기준)
+    order_sum = float(sub["오더금액"].sum())
+    calc_sum = float(sub["계산"].sum())
+
+    return sub, picked, order_sum, calc_sum
+
+
+# 파일 단위 결과(소계표/매핑/합계)만 캐시 → 같은 파일 재처리 시 파싱·필터 모두 생략, 원본 DataFrame은 캐시에 남기지 않음
+@st.cache_data(show_spinner=False, max_entries=32)
+def _process_one(name: str, data: bytes) -> Tuple[str, str, pd.DataFrame, Dict[str, str], float, float]:
+    label = _XLSX_EXT_RE.sub("", name).strip() or name
+    df_o, used_sheet = _load_original(data)
+    df_f, picked, order_sum, calc_sum = _make_filtered(df_o)
+    return label, used_sheet, df_f, picked, order_sum, calc_sum
+
+
+def _write_cell(ws, r: int, c: int, v: Any, fmts: Dict[str, Any]) -> None:
+    # 셀 쓰기가 결과 생성 시간의 대부분 → 흔한 타입은 write()의 범용 분기(수식/URL 정규식 검사)를 건너뛰고 직접 기록
+    #    (문자열은 항상 텍스트로 기록: URL은 하이퍼링크로 바꾸지 않음
+    #     ⚠ 기존 openpyxl 저장은 "="로 시작하는 문자열을 수식으로 기록했음 → 이제는 원본 값 그대로 텍스트로 남김)
+    if v is None or v is pd.NaT or v is pd.NA:
+        return
+    if isinstance(v, str):
+        if v:
+            ws.write_string(r, c, v)
+    elif isinstance(v, bool):
+        ws.write_boolean(r, c, v)
+    elif isinstance(v, (int, float)):
+        if math.isfinite(v):
+            ws.write_number(r, c, v)
+        elif v == v:  # to_excel과 동일: NaN은 빈칸, inf는 문자열
+            ws.write_string(r, c, "inf" if v > 0 else "-inf")
+    elif isinstance(v, date):
+        # calamine은 자정 시각을 date로 돌려줌 → 기존 출력(pandas datetime)과 같게 날짜도 일시 형식으로 통일
+        ws.write_datetime(r, c, v, fmts["datetime"])
+    elif isinstance(v, time):
+        # 시각만 있는 셀(calamine/openpyxl 모두 time) → 형식 없이 쓰면 0.5625 같은 숫자로 보임
+        ws.write_datetime(r, c, v, fmts["time"])
+    else:
+        ws.write(r, c, v)
+
+
+def _write_rows(ws, rows, startrow: int, fmts: Dict[str, Any]) -> None:
+    for r, row in enumerate(rows, start=startrow):
+        for c, v in enumerate(row):
+            _write_cell(ws, r, c, v, fmts)
+
+
+def _write_frame(ws, df: pd.DataFrame, startrow: int, fmts: Dict[str, Any]) -> None:
+    # constant_memory 모드는 행 순서대로만 기록 가능 → 열은 NumPy object 배열로 한 번에 변환 후 행 단위로 기록
+    ws.write_row(startrow, 0, list(df.columns), fmts["header"])
+    cols = [df.iloc[:, j].to_numpy(dtype=object) for j in range(df.shape[1])]
+    _write_rows(ws, zip(*cols), startrow + 1, fmts)
+
+
+def _iter_sheet_rows(data: bytes, sh: str) -> Iterator[list]:
+    # 원본 시트의 셀 값을 DataFrame 없이 행 단위로 꺼냄 (1행 = 원본 헤더)
+    if READ_ENGINE == "calamine":
+        book = python_calamine.load_workbook(io.BytesIO(data))
+        yield from book.get_sheet_by_name(sh).to_python(skip_empty_area=False)
+    else:
+        book = openpyxl.load_workbook(io.BytesIO(data), read_only=True, data_only=True)
+        try:
+            yield from book[sh].iter_rows(values_only=True)
+        finally:
+            book.close()
+
+
+def _open_result_book(path: str) -> Tuple[xlsxwriter.Workbook, Dict[str, Any]]:
+    # pd.ExcelWriter 대신 xlsxwriter를 직접 사용 (constant_memory: 행 단위로 바로 flush)
+    #    write()/write_row()를 타는 헤더 등도 문자열을 그대로 기록하도록 자동 변환 옵션은 모두 끔
+    wb = xlsxwriter.Workbook(path, {
+        "constant_memory": True,
+        "strings_to_numbers": False,
+        "strings_to_formulas": False,
+        "strings_to_urls": False,
+    })
+    fmts = {
+        "header": wb.add_format({"bold": True, "border": 1, "align": "center", "valign": "top"}),
+        "datetime": wb.add_format({"num_format": "YYYY-MM-DD HH:MM:SS"}),
+        "time": wb.add_format({"num_format": "HH:MM:SS"}),
+    }
+    return wb, fmts
+
+
+def _write_file_sheet(ws, df_f: pd.DataFrame, data: bytes, used_sheet: str, fmts: Dict[str, Any]) -> None:
+    _write_frame(ws, df_f, 0, fmts)
+    startrow = (1 + len(df_f)) + 2
+
+    # 원본 시트는 pandas를 거치지 않고 업로드 파일의 셀 값을 그대로 행 단위 복사
+    rows = iter(_iter_sheet_rows(data, used_sheet))
+    header = next(rows, None)
+    if header is not None:
+        ws.write_row(startrow, 0, header, fmts["header"])
+        _write_rows(ws, rows, startrow + 1, fmts)
 
 
 # =========================
@@ -167,51 +420,56 @@ if not files:
 show_debug = st.checkbox("디버그(컬럼 매핑 확인) 보기", value=True)
 
 if st.button("처리 & 결과 생성", type="primary"):
-    per_orig: Dict[str, pd.DataFrame] = {}
-    per_sub: Dict[str, pd.DataFrame] = {}
-    summary_rows: List[dict] = []
-    debug_rows: List[dict] = []
+    summary_rows: List[tuple] = []
+    debug_rows: List[tuple] = []
     errors: List[str] = []
 
-    for f in files:
-        try:
-            label = re.sub(r"\.xlsx$", "", f.name, flags=re.IGNORECASE).strip() or f.name
-
-            df_o, used_sheet = _load_original(f)
-            df_f, picked = _make_filtered(df_o)
-
-            per_orig[label] = df_o
-            per_sub[label] = df_f
-
-            # ✅ 오더금액합계와 동일 방식: 소계표(df_f)에서 합산
-            order_sum = float(df_f["오더금액"].sum()) if "오더금액" in df_f.columns else 0.0
-            calc_sum = float(df_f["계산"].sum()) if "계산" in df_f.columns else 0.0
-
-            summary_rows.append({
-                "시트(파일명)": label,
-                "원본시트": used_sheet,
-                "소계 행수": int(len(df_f)),
-                "오더금액 합계": order_sum,
-                "계산 합계": calc_sum,  # ✅ 요청: 소계(df_f)에서 계산용량(=계산) 합계
-            })
-
-            debug_rows.append({
-                "파일": f.name,
-                "원본시트": used_sheet,
-                "차트번호(매핑)": picked.get("차트번호", ""),
-                "오더코드(매핑)": picked.get("오더코드", ""),
-                "청구코드(매핑)": picked.get("청구코드", ""),
-                "오더금액(매핑)": picked.get("오더금액", ""),
-                "단가(매핑)": picked.get("단가", ""),
-                "계산(매핑)": picked.get("계산", ""),
-                "일수(매핑)": picked.get("일수", ""),
-                "오더명칭(매핑)": picked.get("오더명칭", ""),
-                "소계표 계산 상위5": ", ".join(map(str, df_f["계산"].head(5).tolist())) if "계산" in df_f.columns else "",
-                "소계표 계산 dtype": str(df_f["계산"].dtype) if "계산" in df_f.columns else "(없음)",
-            })
-
-        except Exception as e:
-            errors.append(f"[{f.name}] {e}")
+    # UploadedFile.getvalue()는 내부 버퍼를 복사 없이 돌려줌 → 파일당 한 번만 꺼내 파싱/원본 복사에 같이 사용
+    uploads = [(f.name, f.getvalue()) for f in files]
+
+    # ✅ 파일 하나를 처리하면 그 파일의 시트를 바로 기록하고 다음 파일로 (모든 파일의 소계표를 모아두지 않음)
+    #    요약 시트는 맨 앞에 만들어 두고 내용은 전체 합계가 나온 뒤 기록
+    #    결과는 임시 파일에 기록 → BytesIO 버퍼와 getvalue() 복사본이 동시에 메모리에 올라가지 않음
+    used_names: Dict[str, int] = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "result.xlsx")
+        wb, fmts = _open_result_book(path)
+        ws_summary = wb.add_worksheet(_clean_sheet_name("요약", used_names))
+
+        for name, data in uploads:
+            try:
+                # ✅ order_sum / calc_sum: _make_filtered에서 소계표(df_f) 기준으로 이미 합산됨
+                label, used_sheet, df_f, picked, order_sum, calc_sum = _process_one(name, data)
+
+                # 오류가 난 파일이 있으면 결과 엑셀은 쓰지 않으므로 이후 파일은 처리(오류 확인)만 하고 시트 기록은 생략
+                if not errors:
+                    ws = wb.add_worksheet(_clean_sheet_name(label, used_names))
+                    _write_file_sheet(ws, df_f, data, used_sheet, fmts)
+
+                # 행은 SUMMARY_COLS / DEBUG_COLS 순서의 튜플로 모음
+                #    계산 합계 ✅ 요청: 소계(df_f)에서 계산용량(=계산) 합계
+                summary_rows.append((label, used_sheet, int(len(df_f)), order_sum, calc_sum))
+
+                debug_rows.append((
+                    name,
+                    used_sheet,
+                    *[picked.get(c, "") for c in ALIASES],
+                    ", ".join(map(str, df_f["계산"].head(5).tolist())) if "계산" in df_f.columns else "",
+                    str(df_f["계산"].dtype) if "계산" in df_f.columns else "(없음)",
+                ))
+
+            except Exception as e:
+                errors.append(f"[{name}] {e}")
+
+        if not errors:
+            summary_df = pd.DataFrame.from_records(summary_rows, columns=SUMMARY_COLS).sort_values(
+                "오더금액 합계", ascending=False, ignore_index=True
+            )
+            _write_frame(ws_summary, summary_df, 0, fmts)
+            wb.close()
+
+            with open(path, "rb") as fp:
+                excel_bytes = fp.read()
 
     if errors:
         st.error("오류가 발생했습니다. 아래 확인:")
@@ -219,15 +477,12 @@ if st.button("처리 & 결과 생성", type="primary"):
             st.write(f"- {msg}")
         st.stop()
 
-    summary_df = pd.DataFrame(summary_rows).sort_values("오더금액 합계", ascending=False).reset_index(drop=True)
     st.subheader("요약 시트 미리보기 (소계 기준 오더금액 합계 + 계산 합계)")
     st.dataframe(summary_df, use_container_width=True)
 
     if show_debug:
         st.subheader("디버그: 표준 컬럼 매핑 결과/값 확인")
-        st.dataframe(pd.DataFrame(debug_rows), use_container_width=True)
-
-    excel_bytes = _build_excel(per_orig, per_sub, summary_df)
+        st.dataframe(pd.DataFrame.from_records(debug_rows, columns=DEBUG_COLS), use_container_width=True)
 
     st.download_button(
         label="결과 엑셀 다운로드",